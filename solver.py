@@ -1,13 +1,19 @@
+import os
 import pychoco as pc
 import visuals as vis
 
 from tqdm import tqdm
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# Boards up to this size have their results memoized by region layout
+SMALL_BOARD_MAX_N = 4
+_SMALL_CACHE: dict[tuple, tuple] = {}
 
 def get_puzzle_size(puzzle):
     """Calculates the size n of the n x n puzzle."""
     if isinstance(puzzle, str):
-        return len([ln for ln in puzzle.strip().splitlines() if ln.strip()])
+        return sum(1 for ln in puzzle.splitlines() if ln.strip())
     return len(puzzle)
 
 def get_puzzle_regions(puzzle_matrix):
@@ -15,11 +21,86 @@ def get_puzzle_regions(puzzle_matrix):
     regions = {}
     for r, row in enumerate(puzzle_matrix):
         for c, val in enumerate(row):
-            if val not in regions:
-                regions[val] = []
-            regions[val].append((r, c))
+            regions.setdefault(val, []).append((r, c))
     return regions
 
+def reduce_domains(regions, n):
+    """
+    Prunes the candidate columns of every row before search, repeating until nothing changes:
+    a row left with a single column takes that column from every other row and its neighbouring columns
+    from the adjacent rows, and a region whose remaining cells lie in a single row (or column) claims that
+    row (or column) for itself.
+    Returns a list with the set of candidate columns of each row, or None if the puzzle has no solution.
+    """
+    # Domains and regions are handled as column bitmasks (bit c set = column c), one int per row
+    full = (1 << n) - 1
+    allowed = [full] * n
+
+    region_masks = []
+    for region_cells in regions.values():
+        row_masks = {}
+        for r, c in region_cells:
+            row_masks[r] = row_masks.get(r, 0) | (1 << c)
+        region_masks.append(list(row_masks.items()))
+
+    changed = True
+    while changed:
+        changed = False
+
+        # Row with a single candidate: clear its column and, on the adjacent rows, its neighbours
+        for r in range(n):
+            mask = allowed[r]
+            if not mask:
+                return None
+            if mask & (mask - 1):
+                continue
+            neighbours = (mask << 1 | mask | mask >> 1) & full
+            for other in range(n):
+                if other == r:
+                    continue
+                banned = neighbours if abs(other - r) == 1 else mask
+                if allowed[other] & banned:
+                    allowed[other] &= ~banned
+                    changed = True
+
+        # Region confined to a single row or column: that row or column must place its queen in the region
+        for row_masks in region_masks:
+            rows = []
+            cols = 0
+            for r, m in row_masks:
+                live = allowed[r] & m
+                if live:
+                    rows.append(r)
+                    cols |= live
+            if not cols:
+                return None
+            if len(rows) == 1:
+                r = rows[0]
+                if allowed[r] & ~cols:
+                    allowed[r] &= cols
+                    changed = True
+            if not cols & (cols - 1):
+                for r in range(n):
+                    if r not in rows and allowed[r] & cols:
+                        allowed[r] &= ~cols
+                        changed = True
+
+        if not all(allowed):
+            return None
+
+    return [{c for c in range(n) if mask >> c & 1} for mask in allowed]
+
+def get_region_signature(regions):
+    """Canonical form of the region layout, independent of the region labels."""
+    return tuple(sorted(tuple(sorted(cells)) for cells in regions.values()))
+
+def has_mirror_symmetry(regions, n):
+    """Checks whether the region layout is unchanged by a left/right or up/down mirror of the board."""
+    layout = {frozenset(cells) for cells in regions.values()}
+    left_right = {frozenset((r, n - 1 - c) for r, c in cells) for cells in layout}
+    up_down = {frozenset((n - 1 - r, c) for r, c in cells) for cells in layout}
+    return layout == left_right or layout == up_down
+
 def write_board_to_txt(board_rows, output_path: Path):
     """
     Writes the board representation to a text file.
@@ -28,84 +109,122 @@ def write_board_to_txt(board_rows, output_path: Path):
     :param output_path: Path to the output text file
     """
     with output_path.open("w") as f:
-        for row in board_rows:
-            f.write(",".join(str(cell) for cell in row) + "\n")
+        f.write("".join(",".join(map(str, row)) + "\n" for row in board_rows))
 
-def solve_puzzle(puzzle_text_path: Path = None, puzzle_matrix = None) -> dict:
+def search_solutions(regions, n, max_solutions: int | None = None):
     """
-    Solve the Linked In Queens puzzle given either a text file path or a matrix representation.
-    Returns a dictionary with the number of solutions found, the initial board, and the positions of the queens.
+    Builds and solves the CP model for a region layout.
 
-    :param puzzle_text_path: Path to the text file containing the puzzle representation
-    :param puzzle_matrix: Matrix representation of the puzzle
-    :return: dict with keys "number_of_solutions", "initial_board", "queens"
+    :param regions: dict mapping region value to list of (row, col) tuples
+    :param n: Size of the n x n puzzle
+    :param max_solutions: Stop counting once this many solutions are found (None counts them all)
+    :return: tuple (queens, number_of_solutions), queens being the (row, col) tuples of the first solution
     """
 
-    if puzzle_text_path is None and puzzle_matrix is None:
-        raise ValueError("Either puzzle_text_path or puzzle_matrix must be provided.")
-    if puzzle_matrix is not None:
-        puzzle = puzzle_matrix
-    else:
-        puzzle = vis.parse_board_from_txt(puzzle_text_path)
-
-    n = get_puzzle_size(puzzle)
-    regions = get_puzzle_regions(puzzle)
+    # Cheap deductions first, so the solver starts from smaller domains
+    allowed = reduce_domains(regions, n)
+    if allowed is None:
+        return [], 0
 
     # Solve the puzzle using PyChoco
     model = pc.Model()
 
     ## Vars
-    queen_col = model.intvars(n, 0, n-1)
-
-    # Boolean cell matrix indicating if a queen is at (r, c)
-    cell_has_queen = [[model.boolvar() for _ in range(n)] for _ in range(n)]
-
-    # Mapping queen positions to cell matrix
-    for r in range(n):
-        for c in range(n):
-            model.arithm(queen_col[r], "=", c).reify_with(cell_has_queen[r][c])
+    queen_col = [model.intvar(sorted(allowed[r])) for r in range(n)]
 
     ## Linkedin Queens Rules
-
-    # 1) Only one queen per column and per line
-    model.all_different(queen_col).post()
+    # Posted from the tightest to the loosest, so the strongest pruning runs first
+
+    # 1) Each region should have exactly one queen, smallest regions first
+    # One boolean per row crossing the region, true when that row's queen lands inside it
+    # (cells already pruned from the row's domain are left out, and rows with none left get no boolean)
+    member, model_sum = model.member, model.sum
+    for region_cells in sorted(regions.values(), key=len):
+        rows_in_region = {}
+        for r, c in region_cells:
+            if c in allowed[r]:
+                rows_in_region.setdefault(r, []).append(c)
+        row_has_queen = [member(queen_col[r], cols).reify() for r, cols in rows_in_region.items()]
+        model_sum(row_has_queen, "=", 1).post()
 
     # 2) There can't be Queens at cell distance 1 from each other
+    # (distance is already arc consistent on these binary pairs, so a table encoding would not prune more)
     for i in range(n - 1):
         model.distance(queen_col[i], queen_col[i+1], ">", 1).post()
 
-    # 3) Each region should have exactly one queen
-    for region_cells in regions.values():
-        model.sum([cell_has_queen[r][c] for r, c in region_cells], "=", 1).post()
-    
+    # 3) Only one queen per column and per line
+    model.all_different(queen_col).post()
+
+    # 4) Symmetry breaking: a mirrored layout pairs every solution with its (distinct) mirror image,
+    # and either mirror swaps the order of the first and last queens, so only one of each pair is searched
+    symmetry_factor = 1
+    if n > 1 and has_mirror_symmetry(regions, n):
+        model.arithm(queen_col[0], "<", queen_col[n-1]).post()
+        symmetry_factor = 2
+
     solver = model.get_solver()
 
     # first solution
-    solver.solve()
+    if not solver.solve():
+        return [], 0
     first_solution = [(r, queen_col[r].get_value()) for r in range(n)]
 
     # count other solutions
-    count = 1
-    while solver.solve():
-        count += 1
+    # (find_all_solutions would count inside Choco too, but it records every solution and runs slower)
+    count = symmetry_factor
+    while (max_solutions is None or count < max_solutions) and solver.solve():
+        count += symmetry_factor
+
+    return first_solution, count
+
+def solve_puzzle(puzzle_text_path: Path = None, puzzle_matrix = None, max_solutions: int | None = None) -> dict:
+    """
+    Solve the Linked In Queens puzzle given either a text file path or a matrix representation.
+    Returns a dictionary with the number of solutions found, the initial board, and the positions of the queens.
+
+    :param puzzle_text_path: Path to the text file containing the puzzle representation
+    :param puzzle_matrix: Matrix representation of the puzzle
+    :param max_solutions: Stop counting once this many solutions are found (None counts them all)
+    :return: dict with keys "number_of_solutions", "initial_board", "queens"
+    """
+
+    if puzzle_text_path is None and puzzle_matrix is None:
+        raise ValueError("Either puzzle_text_path or puzzle_matrix must be provided.")
+    if puzzle_matrix is not None:
+        puzzle = puzzle_matrix
+    else:
+        puzzle = vis.parse_board_from_txt(puzzle_text_path)
+
+    n = get_puzzle_size(puzzle)
+    regions = get_puzzle_regions(puzzle)
+
+    # Small boards often repeat a layout under different region labels, so their results are memoized
+    if n <= SMALL_BOARD_MAX_N:
+        key = (get_region_signature(regions), max_solutions)
+        if key not in _SMALL_CACHE:
+            _SMALL_CACHE[key] = search_solutions(regions, n, max_solutions)
+        queens, count = _SMALL_CACHE[key]
+    else:
+        queens, count = search_solutions(regions, n, max_solutions)
 
     return {
         "number_of_solutions": count,
         "initial_board" : puzzle,
-        "queens" : first_solution
+        "queens" : list(queens)
     }
 
-def single_puzzle_solve(puzzle_text_path: Path, output_image_path: Path, output_text_path: Path, save: bool = True, verbose: bool = False):
+def single_puzzle_solve(puzzle_text_path: Path, output_image_path: Path, output_text_path: Path, save: bool = True, verbose: bool = False, puzzle_matrix = None):
     """
     Solve a single puzzle given its text file path, and save/display the solution.
     
     :param puzzle_text_path: Path to the text file containing the puzzle representation
     :param output_image_path: Path to save the output image
     :param output_text_path: Path to save the output text file
+    :param puzzle_matrix: Already parsed puzzle, skips reading puzzle_text_path when given
     """
 
-    # Solve the puzzle
-    solution = solve_puzzle(puzzle_text_path)
+    # Solve the puzzle (two solutions are enough to tell a unique puzzle apart)
+    solution = solve_puzzle(puzzle_text_path, puzzle_matrix=puzzle_matrix, max_solutions=2)
 
     # Extract initial board and queen positions from the solution
     initial_board = solution['initial_board']
@@ -113,7 +232,7 @@ def single_puzzle_solve(puzzle_text_path: Path, output_image_path: Path, output_
     number_of_solutions = solution['number_of_solutions']
 
     if number_of_solutions != 1:
-        print(f"Warning: Puzzle {puzzle_text_path.name} has {number_of_solutions} solutions.")
+        print(f"Warning: Puzzle {puzzle_text_path.name} has {'no' if number_of_solutions == 0 else 'more than one'} solution.")
 
     if verbose:
         print(f"Puzzle: {puzzle_text_path.name} - Number of solutions found: {number_of_solutions}")
@@ -122,6 +241,10 @@ def single_puzzle_solve(puzzle_text_path: Path, output_image_path: Path, output_
     if save:
         save_and_display_solution(initial_board, queens, output_image_path=output_image_path, output_text_path=output_text_path, save_image=True, display=False)
 
+def _solve_one(args):
+    """Unpacks a (puzzle_file, img_path, txt_path, save, verbose, puzzle_matrix) tuple for the process pool."""
+    return single_puzzle_solve(*args)
+
 def all_puzzles_solve(puzzles_dir: Path, output_image_path: Path, output_text_path: Path, save: bool = True, verbose: bool = False):
     """
     Solve all puzzles in a directory, saving and optionally displaying their solutions.
@@ -132,15 +255,19 @@ def all_puzzles_solve(puzzles_dir: Path, output_image_path: Path, output_text_pa
     :param verbose: Whether to print progress information
     """
     puzzle_files = sorted(puzzles_dir.glob("*.txt"))
-    
-    for puzzle_file in tqdm(puzzle_files, desc="Solving puzzles", unit="puzzle"):
-        single_puzzle_solve(
-            puzzle_file, 
-            output_image_path / f"{puzzle_file.stem}.png", 
-            output_text_path=output_text_path / f"{puzzle_file.stem}.txt", 
-            save=save,
-            verbose=verbose
-        )
+
+    # Parse every board up front so the workers only build and solve models
+    puzzle_matrices = [vis.parse_board_from_txt(puzzle_file) for puzzle_file in puzzle_files]
+
+    # Each puzzle is an independent CP model, so they are dispatched across processes
+    args = [
+        (puzzle_file, output_image_path / f"{puzzle_file.stem}.png", output_text_path / f"{puzzle_file.stem}.txt", save, verbose, puzzle_matrix)
+        for puzzle_file, puzzle_matrix in zip(puzzle_files, puzzle_matrices)
+    ]
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for _ in tqdm(executor.map(_solve_one, args, chunksize=8), total=len(puzzle_files), desc="Solving puzzles", unit="puzzle"):
+            pass
 
 def save_and_display_solution(initial_board, queens, output_text_path: str = "./outputs/solution.txt", output_image_path: str = "./outputs/solution.png", save_text=True, save_image=True, display=False):
     """
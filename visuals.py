@@ -1,3 +1,6 @@
+import csv
+
+from functools import lru_cache
 from pathlib import Path
 from PIL import Image, ImageDraw
 
@@ -25,18 +28,26 @@ PALETTE = {
   "20": "#00F0FF",  # Electric Cyan
 }
 
+PALETTE_RGB = {k: tuple(int(v[i:i+2], 16) for i in (1, 3, 5)) for k, v in PALETTE.items()}
+
+# Strips queen markers ("Q0" -> "0") from cell values
+QUEEN_STRIP = str.maketrans("", "", "Qq")
+
 CANVAS = 500 
 OUTER_W = max(8, CANVAS // 60)
 GRID_W = max(2, OUTER_W // 2)
 
+QUEEN_PATH = Path("./images/queen.png")
+
 def parse_board_from_txt(txt_path: Path):
     rows = []
-    for line in txt_path.read_text().splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        parts = [p.strip() for p in line.split(",")] if "," in line else line.split()
-        rows.append([str(p) for p in parts if p != ""])
+    for parts in csv.reader(txt_path.read_text().splitlines()):
+        # lines without commas are whitespace separated
+        if len(parts) == 1:
+            parts = parts[0].split()
+        parts = [p.strip() for p in parts]
+        if any(parts):
+            rows.append([p for p in parts if p != ""])
 
     if len(set(len(r) for r in rows)) != 1:
         raise ValueError("Inconsistent row lengths in board representation.")
@@ -53,28 +64,30 @@ def compute_layout(nr, nc, size=CANVAS, outer=OUTER_W, grid=GRID_W):
     base_cw, rem_w = divmod(usable_w, nc)
     base_ch, rem_h = divmod(usable_h, nr)
 
-    # distribute remainder: first rem_w cols get +1 pixel
-    col_widths = [base_cw + (1 if c < rem_w else 0) for c in range(nc)]
-    row_heights = [base_ch + (1 if r < rem_h else 0) for r in range(nr)]
+    # distribute remainder: first rem_w cols get +1 pixel, so edge c sits after c cells, c grid lines
+    # and min(c, rem_w) extra pixels; the last edge always lands on the inner side of the border
+    x = [outer + c * (base_cw + grid) + (c if c < rem_w else rem_w) for c in range(nc)] + [size - outer]
+    y = [outer + r * (base_ch + grid) + (r if r < rem_h else rem_h) for r in range(nr)] + [size - outer]
 
-    x = [outer]
-    for c in range(nc):
-        x.append(x[-1] + col_widths[c])
-        if c < nc - 1:
-            x[-1] += grid
+    return x, y
 
-    y = [outer]
-    for r in range(nr):
-        y.append(y[-1] + row_heights[r])
-        if r < nr - 1:
-            y[-1] += grid
+@lru_cache(maxsize=None)
+def load_queen_image():
+    """Loads the queen sprite once, or returns None if it is missing."""
+    if not QUEEN_PATH.exists():
+        return None
+    return Image.open(QUEEN_PATH).convert("RGBA")
 
-    return x, y
+@lru_cache(maxsize=None)
+def get_queen_image(cell_w, cell_h):
+    """Returns the queen sprite resized to a cell, resampled once per cell size."""
+    return load_queen_image().resize((cell_w, cell_h), Image.LANCZOS)
 
 def generate_board_visuals(board_rows, output_path: Path = Path("./outputs"), save_image=False, display=False):
     nr, nc = len(board_rows), len(board_rows[0])
 
-    img = Image.new("RGB", (CANVAS, CANVAS), color="white")
+    # Black canvas: the gaps left between cells form the grid lines and the outer border
+    img = Image.new("RGB", (CANVAS, CANVAS), color="black")
     d = ImageDraw.Draw(img)
 
     x_edges, y_edges = compute_layout(nr, nc)
@@ -83,52 +96,31 @@ def generate_board_visuals(board_rows, output_path: Path = Path("./outputs"), sa
     for r in range(nr):
         for c in range(nc):
             raw_val = board_rows[r][c]
-            s = str(raw_val)
-            if "Q" in s or "q" in s:
-                s = s.replace("Q", "").replace("q", "")
-            s = s.strip()
+            s = str(raw_val).translate(QUEEN_STRIP).strip()
 
-            if s not in PALETTE:
+            color_rgb = PALETTE_RGB.get(s)
+            if color_rgb is None:
                 raise KeyError(f"Cell ({r},{c}) value '{raw_val}' not found in PALETTE.")
-            
-            color_hex = PALETTE[s]
-            color_rgb = tuple(int(color_hex[i:i+2], 16) for i in (1, 3, 5))
 
             x0 = x_edges[c]
-            x1 = x_edges[c + 1] - (GRID_W if c < nc - 1 else 0)
+            x1 = x_edges[c + 1] - (GRID_W if c < nc - 1 else 0) - 1
             y0 = y_edges[r]
-            y1 = y_edges[r + 1] - (GRID_W if r < nr - 1 else 0)
+            y1 = y_edges[r + 1] - (GRID_W if r < nr - 1 else 0) - 1
             d.rectangle([x0, y0, x1, y1], fill=color_rgb)
 
-    # Draw inner grid lines (thin)
-    # verticals between cells
-    for c in range(1, nc):
-        x = x_edges[c] - GRID_W
-        d.rectangle([x, OUTER_W, x + GRID_W - 1, CANVAS - OUTER_W - 1], fill="black")
-    # horizontals between cells
-    for r in range(1, nr):
-        y = y_edges[r] - GRID_W
-        d.rectangle([OUTER_W, y, CANVAS - OUTER_W - 1, y + GRID_W - 1], fill="black")
-
     # Drawing queens if existent
-    queen_path = Path("./images/queen.png")
-    if queen_path.exists():
-        queen_path_img = Image.open(queen_path).convert("RGBA")
+    if load_queen_image() is not None:
         for r in range(nr):
             for c in range(nc):
                 if "Q" in str(board_rows[r][c]):
                     # Resize queen image to fit cell
                     cell_w = x_edges[c + 1] - x_edges[c] - (GRID_W if c < nc - 1 else 0)
                     cell_h = y_edges[r + 1] - y_edges[r] - (GRID_W if r < nr - 1 else 0)
-                    queen_resized = queen_path_img.resize((cell_w, cell_h), Image.LANCZOS)
+                    queen_resized = get_queen_image(cell_w, cell_h)
 
                     # Paste queen image onto board
                     img.paste(queen_resized, (x_edges[c], y_edges[r]), queen_resized)
 
-    # Outer border (thicker)
-    ow = OUTER_W
-    d.rectangle([0, 0, CANVAS - 1, CANVAS - 1], outline="black", width=ow)
-
     output_path.parent.mkdir(parents=True, exist_ok=True)
     if save_image:
         img.save(output_path, "PNG")